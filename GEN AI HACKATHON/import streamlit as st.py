@@ -1,102 +1,585 @@
 import streamlit as st
 import json
 import io
-import base64
-import time
-from typing import Optional, Tuple
+import gc
+import asyncio
+import threading
+import re
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Tuple, NamedTuple
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 import tempfile
 import os
 from pathlib import Path
+from types import MappingProxyType
+
+try:
+    # Optional compiled fast path, built with `cythonize -i tone_rewrite.pyx`
+    from tone_rewrite import ToneRewriter
+except ImportError:
+    ToneRewriter = None
 
 # Mock implementations for IBM Watson services
 # In production, you would use actual IBM Watson SDK
 
+VOICE_OPTIONS = ("Lisa", "Michael", "Allison")
+TONE_OPTIONS = ("Neutral", "Suspenseful", "Inspiring")
+
+TONE_DESCRIPTIONS = MappingProxyType({
+    "Neutral": "📝 Clear, balanced, and objective narration",
+    "Suspenseful": "🎭 Dramatic tension and engaging mystery",
+    "Inspiring": "✨ Uplifting and motivational delivery"
+})
+
+# Inputs longer than this are rewritten paragraph by paragraph in parallel
+PARALLEL_REWRITE_WORDS = 500
+
+# Synthesized audio is shadowed here so the cache survives across sessions
+TTS_CACHE_DIR = Path(tempfile.gettempdir()) / "echoverse_cache"
+# Least recently used chunks beyond this many files are evicted from the disk cache
+TTS_CACHE_MAX_FILES = 1024
+
+# Tone rewrite rules as (pattern, replacement) pairs, consumed by one shared engine
+_TONE_RULES = {
+    # Add suspenseful elements
+    "Suspenseful": (("important", "crucial"), ("will", "shall"), (".", "... ")),
+    # Add inspirational elements
+    "Inspiring": (("can", "have the power to"), ("should", "are destined to"), ("difficult", "challenging yet conquerable")),
+    # Clean, professional tone
+    "Neutral": (("!", "."), ("amazing", "notable"), ("awesome", "effective")),
+}
+
+def _rule_pattern(key: str) -> str:
+    # Whole words only, so "will" doesn't rewrite the inside of "willing"
+    return rf"\b{re.escape(key)}\b" if key[0].isalnum() else re.escape(key)
+
+_TONE_RE = {
+    tone: re.compile("|".join(_rule_pattern(key) for key, _ in rules))
+    for tone, rules in _TONE_RULES.items()
+}
+_TONE_MAP = {tone: dict(rules) for tone, rules in _TONE_RULES.items()}
+
+# Aho-Corasick automata from the compiled extension, when it is available
+_TONE_REWRITERS = (
+    {tone: ToneRewriter(rules) for tone, rules in _TONE_RULES.items()}
+    if ToneRewriter is not None else {}
+)
+
+def _apply_tone_rules(text: str, tone: str) -> str:
+    """Apply every rule for the tone in a single pass"""
+    rewriter = _TONE_REWRITERS.get(tone)
+    if rewriter is not None:
+        return rewriter.rewrite(text)
+    
+    if tone not in _TONE_RE:
+        return text
+    replacements = _TONE_MAP[tone]
+    return _TONE_RE[tone].sub(lambda m: replacements[m.group(0)], text)
+
+def _digest(*parts: str) -> str:
+    """Return a short, fixed-size cache key for the given strings"""
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).hexdigest()
+
 class MockWatsonxLLM:
     """Mock implementation of IBM Watsonx Granite LLM for tone adaptation"""
     
+    # Prompt templates for the real Watsonx call, built once with the class
+    TONE_PROMPTS = MappingProxyType({
+        "Neutral": "Rewrite the following text in a clear, balanced, and objective tone while preserving all original meaning and key information:",
+        "Suspenseful": "Rewrite the following text with dramatic tension, mystery, and engaging suspense while preserving all original meaning and key information:",
+        "Inspiring": "Rewrite the following text with an uplifting, motivational, and inspiring tone while preserving all original meaning and key information:"
+    })
+    
     @staticmethod
     def rewrite_text(text: str, tone: str) -> str:
         """Rewrite text with specified tone while preserving meaning"""
+        return MockWatsonxLLM._frame(MockWatsonxLLM._rewrite_passage(text, tone), tone)
+    
+    @staticmethod
+    def rewrite_text_batch(texts: list, tones: list) -> list:
+        """Rewrite several texts in one call, each with its own tone"""
+        # A real Watsonx deployment would receive the whole batch in one request
+        return [MockWatsonxLLM.rewrite_text(text, tone) for text, tone in zip(texts, tones)]
+    
+    @staticmethod
+    def rewrite_text_parallel(text: str, tone: str, max_workers: int = 4) -> str:
+        """Rewrite each paragraph concurrently and reassemble them in order"""
         
-        tone_prompts = {
-            "Neutral": "Rewrite the following text in a clear, balanced, and objective tone while preserving all original meaning and key information:",
-            "Suspenseful": "Rewrite the following text with dramatic tension, mystery, and engaging suspense while preserving all original meaning and key information:",
-            "Inspiring": "Rewrite the following text with an uplifting, motivational, and inspiring tone while preserving all original meaning and key information:"
-        }
+        paragraphs = text.split("\n\n")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(MockWatsonxLLM._rewrite_passage, paragraph, tone) for paragraph in paragraphs]
+            rewritten = "\n\n".join(future.result() for future in futures)
         
+        return MockWatsonxLLM._frame(rewritten, tone)
+    
+    @staticmethod
+    def _rewrite_passage(text: str, tone: str) -> str:
+        """Apply the tone's word-level rewrites to a passage"""
         # Simulate tone-adaptive rewriting based on the original text
+        return _apply_tone_rules(text, tone)
+    
+    @staticmethod
+    def _frame(text: str, tone: str) -> str:
+        """Wrap the whole rewritten text in the tone's opening and closing lines"""
         if tone == "Suspenseful":
-            # Add suspenseful elements
-            text = text.replace(".", "... ")
-            text = text.replace("important", "crucial")
-            text = text.replace("will", "shall")
-            text = f"What lies ahead? {text} The answer may surprise you."
-            
-        elif tone == "Inspiring":
-            # Add inspirational elements
-            text = text.replace("can", "have the power to")
-            text = text.replace("should", "are destined to")
-            text = text.replace("difficult", "challenging yet conquerable")
-            text = f"Imagine the possibilities: {text} Your journey begins now!"
-            
-        elif tone == "Neutral":
-            # Clean, professional tone
-            text = text.replace("!", ".")
-            text = text.replace("amazing", "notable")
-            text = text.replace("awesome", "effective")
-            
+            return f"What lies ahead? {text} The answer may surprise you."
+        if tone == "Inspiring":
+            return f"Imagine the possibilities: {text} Your journey begins now!"
         return text
 
 class MockWatsonTTS:
     """Mock implementation of IBM Watson Text-to-Speech"""
     
     @staticmethod
-    def synthesize(text: str, voice: str = "Lisa") -> bytes:
-        """Convert text to speech and return audio bytes"""
+    def split_chunks(text: str) -> list:
+        """Split text into sentence-sized chunks for synthesis"""
+        return [chunk for chunk in re.split(r'(?<=[.!?])\s+', text) if chunk]
+    
+    @staticmethod
+    async def synthesize(text: str, voice: str = "Lisa") -> bytes:
+        """Convert a single chunk of text to speech without blocking the event loop"""
+        digest = _digest(text, voice)
+        
+        # Disk cache I/O runs in a worker thread so it never stalls the shared event loop
+        audio_data = await asyncio.to_thread(MockWatsonTTS._cache_lookup, digest)
+        if audio_data is None:
+            audio_data = await MockWatsonTTS._call_tts(text, voice)
+            await asyncio.to_thread(MockWatsonTTS._cache_store, digest, audio_data)
+        
+        return audio_data
+    
+    @staticmethod
+    def synthesize_chunk(text: str, voice: str = "Lisa") -> bytes:
+        """Convert a single chunk of text to speech from synchronous code"""
+        return asyncio.run(MockWatsonTTS.synthesize(text, voice))
+    
+    @staticmethod
+    def _cache_lookup(digest: str) -> Optional[bytes]:
+        """Return audio from the disk cache, if this chunk was synthesized before"""
+        cache_file = TTS_CACHE_DIR / f"{digest}.mp3"
+        try:
+            audio_data = cache_file.read_bytes()
+            # Refresh the timestamp so eviction drops the least recently used files first
+            os.utime(cache_file)
+        except OSError:
+            return None
+        return audio_data
+    
+    @staticmethod
+    def _cache_store(digest: str, audio_data: bytes):
+        """Shadow audio to the disk cache and evict the oldest files past the cap"""
+        cache_file = TTS_CACHE_DIR / f"{digest}.mp3"
+        partial_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.part")
+        
+        try:
+            TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent readers never see a half-written file
+            partial_file.write_bytes(audio_data)
+            os.replace(partial_file, cache_file)
+            MockWatsonTTS._evict_cache()
+        except OSError:
+            # The disk cache is best-effort; synthesis still succeeds without it
+            pass
+    
+    @staticmethod
+    def _evict_cache():
+        """Remove the least recently used cache files beyond TTS_CACHE_MAX_FILES"""
+        entries = []
+        for cache_file in TTS_CACHE_DIR.glob("*.mp3"):
+            try:
+                entries.append((cache_file.stat().st_mtime, cache_file))
+            except OSError:
+                # Already evicted by another worker
+                continue
+        
+        entries.sort()
+        for _, cache_file in entries[:-TTS_CACHE_MAX_FILES]:
+            cache_file.unlink(missing_ok=True)
+    
+    @staticmethod
+    async def _call_tts(text: str, voice: str) -> bytes:
+        """Call the TTS service for a single chunk"""
         
-        # In a real implementation, this would call IBM Watson TTS API
+        # In a real implementation, this would call IBM Watson TTS API with
+        # get_tts_session().post, run off the event loop so network waits overlap
         # For demo purposes, we'll create a placeholder audio response
         
         # Simulate API delay
-        time.sleep(1)
+        await asyncio.sleep(1)
         
         # Return mock audio data (in real implementation, this would be actual audio)
-        audio_data = b"MOCK_AUDIO_DATA_" + text[:50].encode() + b"_" + voice.encode()
-        return base64.b64encode(audio_data)
+        return b"MOCK_AUDIO_DATA_" + text[:50].encode() + b"_" + voice.encode()
+    
+    @staticmethod
+    async def synthesize_chunk_batch(texts: list, voices: list) -> list:
+        """Synthesize several chunks in one call, each with its own voice"""
+        return list(await asyncio.gather(*map(MockWatsonTTS.synthesize, texts, voices)))
+    
+    @staticmethod
+    def synthesize_batch(text: str, voice: str = "Lisa", concurrency: int = 4) -> bytes:
+        """Split text into sentences, synthesize them in parallel and return audio bytes"""
+        
+        chunks = MockWatsonTTS.split_chunks(text)
+        
+        # TTS calls are I/O-bound, so threads are enough to overlap the requests.
+        # Results are buffered by segment index so playback order is preserved.
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(MockWatsonTTS.synthesize_chunk, chunk, voice) for chunk in chunks]
+            segments = {index: future.result() for index, future in enumerate(futures)}
+        
+        return b"".join(segments[index] for index in range(len(chunks)))
+
+class PoolItem(NamedTuple):
+    """A single queued request, tagged with the service stage it targets"""
+    stage: str
+    text: str
+    option: str
+    future: asyncio.Future
+
+class RequestPool:
+    """Instant request pool that coalesces LLM and TTS requests into batched calls"""
+    
+    LLM = "LLM"
+    TTS = "TTS"
+    
+    def __init__(self, max_batch: int = 8, interval: float = 0.05, timeout: float = 60.0):
+        self.max_batch = max_batch
+        self.interval = interval
+        self.timeout = timeout
+        self._handlers = {
+            self.LLM: MockWatsonxLLM.rewrite_text_batch,
+            self.TTS: MockWatsonTTS.synthesize_chunk_batch,
+        }
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="echoverse-request-pool", daemon=True)
+    
+    def start(self) -> "RequestPool":
+        """Start the background event loop that drains the pool"""
+        self._thread.start()
+        self._ready.wait()
+        return self
+    
+    async def submit(self, stage: str, text: str, option: str):
+        """Queue a request for the given stage and wait for its result"""
+        future = self._loop.create_future()
+        await self._queue.put(PoolItem(stage, text, option, future))
+        return await future
+    
+    def submit_threadsafe(self, stage: str, text: str, option: str) -> Future:
+        """Queue a request from another thread and return a concurrent future for its result"""
+        return asyncio.run_coroutine_threadsafe(self.submit(stage, text, option), self._loop)
+    
+    def run(self, stage: str, text: str, option: str):
+        """Submit a request from a synchronous caller such as the Streamlit script thread"""
+        future = self.submit_threadsafe(stage, text, option)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Cancel the queued request so the caller isn't left holding a stuck slot
+            future.cancel()
+            raise
+    
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._loop.create_task(self._drain())
+        self._ready.set()
+        self._loop.run_forever()
+    
+    async def _drain(self):
+        while True:
+            # Wait for the first request, then give other sessions one interval to join the batch
+            items = [await self._queue.get()]
+            await asyncio.sleep(self.interval)
+            while len(items) < self.max_batch and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            
+            # Callers that timed out or were cancelled no longer need an answer
+            items = [item for item in items if not item.future.done()]
+            
+            try:
+                await asyncio.gather(*(
+                    self._dispatch(stage, [item for item in items if item.stage == stage])
+                    for stage in self._handlers
+                ))
+            except Exception as e:
+                # Keep the drain task alive; fail only the requests in this batch
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+    
+    async def _dispatch(self, stage: str, batch: list):
+        if not batch:
+            return
+        
+        handler = self._handlers[stage]
+        texts = [item.text for item in batch]
+        options = [item.option for item in batch]
+        
+        try:
+            if asyncio.iscoroutinefunction(handler):
+                results = await handler(texts, options)
+            else:
+                # Blocking handlers run off the loop so they don't stall other batches
+                results = await self._loop.run_in_executor(None, handler, texts, options)
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        else:
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+
+@st.cache_resource
+def get_request_pool() -> RequestPool:
+    """Return the request pool shared by every session on this server"""
+    return RequestPool().start()
+
+@st.cache_resource
+def get_tts_session() -> requests.Session:
+    """Return the keep-alive HTTP session shared by all TTS calls"""
+    # Pooled connections let parallel chunk requests reuse TLS handshakes
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"})
+        )
+    )
+    session.mount("https://", adapter)
+    return session
+
+# Immutable session state defaults; mutable chunk playback state is set by reset_chunk_playback
+_DEFAULTS = {
+    "original_text": "",
+    "rewritten_text": "",
+    "selected_tone": "Neutral",
+    "selected_voice": "Lisa",
+    "audio_data": None
+}
 
 def initialize_session_state():
     """Initialize Streamlit session state variables"""
-    if 'original_text' not in st.session_state:
-        st.session_state.original_text = ""
-    if 'rewritten_text' not in st.session_state:
-        st.session_state.rewritten_text = ""
-    if 'selected_tone' not in st.session_state:
-        st.session_state.selected_tone = "Neutral"
-    if 'selected_voice' not in st.session_state:
-        st.session_state.selected_voice = "Lisa"
-    if 'audio_data' not in st.session_state:
-        st.session_state.audio_data = None
+    for key, value in _DEFAULTS.items():
+        st.session_state.setdefault(key, value)
+    if 'chunk_audio' not in st.session_state:
+        reset_chunk_playback()
+
+def reset_chunk_playback():
+    """Clear the chunk-by-chunk playback state"""
+    st.session_state.audio_chunks = []
+    st.session_state.chunk_voice = None
+    st.session_state.chunk_index = 0
+    st.session_state.chunk_audio = None
+    st.session_state.chunk_futures = []
+    st.session_state.download_pending = False
+    st.session_state.download_error = None
+
+def _reset_generated():
+    """Drop generated text and audio so their buffers are freed before new input is kept"""
+    for key in ("rewritten_text", "audio_data"):
+        st.session_state.pop(key, None)
+    reset_chunk_playback()
+    gc.collect()
+    
+    st.session_state.rewritten_text = ""
+    st.session_state.audio_data = None
+
+def queue_chunks(chunks: list, voice: str):
+    """Queue every chunk on the request pool, in playback order"""
+    pool = get_request_pool()
+    # Queued straight on the pool so chunks from every session share its batches. The first
+    # chunk goes in first, so playback never waits behind the rest of a long text
+    st.session_state.chunk_futures = [
+        pool.submit_threadsafe(RequestPool.TTS, chunk, voice) for chunk in chunks
+    ]
+    st.session_state.download_pending = True
+
+def advance_chunk():
+    """Collect the next chunk's audio from its request pool future"""
+    index = st.session_state.chunk_index
+    st.session_state.chunk_audio = st.session_state.chunk_futures[index].result(
+        timeout=get_request_pool().timeout
+    )
+    st.session_state.chunk_index = index + 1
+
+def collect_download() -> bool:
+    """Join the chunks into the full audiobook once all have landed; return True when it has"""
+    futures = st.session_state.chunk_futures
+    if not st.session_state.download_pending or not all(future.done() for future in futures):
+        return False
+    
+    st.session_state.download_pending = False
+    try:
+        st.session_state.audio_data = b"".join(future.result() for future in futures)
+    except Exception as e:
+        # Kept in session state so the error survives the poller's rerun
+        st.session_state.download_error = str(e)
+    return True
+
+_WORD_RE = re.compile(r"\S+")
+
+def _word_count(text: str) -> int:
+    """Count whitespace-separated words exactly, without building a token list"""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+@st.cache_data(max_entries=32)
+def text_stats(text: str) -> tuple:
+    """Return (label, value) pairs for word count, character count and reading time"""
+    word_count = _word_count(text)
+    return (
+        ("Words", word_count),
+        ("Characters", len(text)),
+        ("Estimated reading time", f"{word_count // 200 + 1} min")
+    )
+
+@st.cache_data(max_entries=512)
+def _adapt(text: str, tone: str) -> str:
+    """Tone-adapt text, memoized by Streamlit across reruns"""
+    if _word_count(text) > PARALLEL_REWRITE_WORDS:
+        return MockWatsonxLLM.rewrite_text_parallel(text, tone)
+    return get_request_pool().run(RequestPool.LLM, text, tone)
 
+@st.cache_data(max_entries=32)
 def process_uploaded_file(uploaded_file) -> str:
     """Process uploaded text file and return content"""
     try:
-        content = uploaded_file.read()
-        if isinstance(content, bytes):
-            content = content.decode('utf-8')
-        return content.strip()
+        # Decode the upload buffer in 64 KiB pieces instead of copying it into bytes first;
+        # utf-8-sig drops a leading byte order mark so it never reaches the LLM or TTS
+        uploaded_file.seek(0)
+        wrapper = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', errors='replace')
+        try:
+            return "".join(iter(lambda: wrapper.read(64 * 1024), "")).strip()
+        finally:
+            # Detach so closing the wrapper doesn't close Streamlit's upload buffer
+            wrapper.detach()
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
         return ""
 
-def create_audio_player(audio_data: bytes, filename: str = "audiobook.mp3"):
+def create_audio_player(audio_data: bytes, filename: str = "audiobook.mp3") -> bool:
     """Create audio player with download capability"""
     
-    # Create download link
-    b64_audio = base64.b64encode(audio_data).decode()
-    href = f'<a href="data:audio/mp3;base64,{b64_audio}" download="{filename}">Download Audio File</a>'
+    # Streamlit serves both through its media endpoint rather than inlining base64 in the page
+    st.audio(audio_data, format="audio/mp3")
+    
+    return st.download_button(
+        label="📥 Download Audio File",
+        data=audio_data,
+        file_name=filename,
+        mime="audio/mp3"
+    )
+
+@st.fragment(run_every=1)
+def _download_poller():
+    """Check once a second for the background audiobook and rerun the page when it's ready"""
+    st.caption("⏳ Preparing the full audiobook for download...")
+    if collect_download():
+        st.rerun()
+
+@st.fragment
+def _audio_fragment():
+    """Audio generation and playback, rerun on its own when its widgets change"""
+    st.markdown("---")
+    st.header("🎵 Audio Generation")
+    
+    col3, col4 = st.columns([1, 1])
+    
+    with col3:
+        if st.button("🎤 Generate Audio", type="primary"):
+            with st.spinner(f"Converting to speech with {st.session_state.selected_voice} voice..."):
+                try:
+                    # Playback starts after the first chunk; the rest keep synthesizing meanwhile.
+                    # The same futures feed playback and the download, so no chunk is sent twice
+                    reset_chunk_playback()
+                    st.session_state.audio_data = None
+                    st.session_state.audio_chunks = MockWatsonTTS.split_chunks(st.session_state.rewritten_text)
+                    # The whole run keeps this voice even if the sidebar changes mid-playback
+                    st.session_state.chunk_voice = st.session_state.selected_voice
+                    queue_chunks(st.session_state.audio_chunks, st.session_state.chunk_voice)
+                    advance_chunk()
+                    st.success("Audio generated successfully!")
+                except Exception as e:
+                    st.error(f"Error generating audio: {str(e)}")
+    
+    with col4:
+        if st.session_state.chunk_audio:
+            st.subheader("🎧 Your Audiobook")
+            
+            more_chunks = st.session_state.chunk_index < len(st.session_state.audio_chunks)
+            if more_chunks and st.button("⏭️ Next chunk"):
+                with st.spinner("Loading next chunk..."):
+                    try:
+                        advance_chunk()
+                    except Exception as e:
+                        st.error(f"Error generating audio: {str(e)}")
+            
+            st.audio(st.session_state.chunk_audio, format="audio/mp3")
+            st.caption(
+                f"Chunk {st.session_state.chunk_index} of {len(st.session_state.audio_chunks)} | "
+                f"Voice: {st.session_state.chunk_voice} | Tone: {st.session_state.selected_tone}"
+            )
+        
+        collect_download()
+        if st.session_state.download_pending:
+            _download_poller()
+        
+        if st.session_state.download_error:
+            st.error(f"Error generating audio: {st.session_state.download_error}")
+        
+        if st.session_state.audio_data:
+            # Full audiobook player and download
+            filename = f"audiobook_{st.session_state.selected_tone.lower()}_{st.session_state.chunk_voice.lower()}.mp3"
+            
+            if create_audio_player(st.session_state.audio_data, filename):
+                st.success("Download started!")
+
+@st.fragment
+def _comparison_fragment():
+    """Side-by-side comparison of the original and adapted text"""
+    st.markdown("---")
+    st.header("📊 Side-by-Side Comparison")
+    
+    comparison_col1, comparison_col2 = st.columns([1, 1])
     
-    return href
+    with comparison_col1:
+        st.subheader("📄 Original Text")
+        st.text_area(
+            "Original:",
+            value=st.session_state.original_text,
+            height=200,
+            disabled=True,
+            key="original_comparison"
+        )
+        
+        # Text statistics
+        for stat, value in text_stats(st.session_state.original_text):
+            st.metric(stat, value)
+    
+    with comparison_col2:
+        st.subheader(f"🎨 {st.session_state.selected_tone} Version")
+        st.text_area(
+            f"{st.session_state.selected_tone} adaptation:",
+            value=st.session_state.rewritten_text,
+            height=200,
+            disabled=True,
+            key="rewritten_comparison"
+        )
+        
+        # Adapted text statistics
+        for stat, value in text_stats(st.session_state.rewritten_text):
+            st.metric(stat, value)
 
 def main():
     st.set_page_config(
@@ -120,29 +603,22 @@ def main():
         
         # Voice selection
         st.subheader("Voice Selection")
-        voice_options = ["Lisa", "Michael", "Allison"]
         st.session_state.selected_voice = st.selectbox(
             "Choose a voice:",
-            voice_options,
-            index=voice_options.index(st.session_state.selected_voice)
+            VOICE_OPTIONS,
+            index=VOICE_OPTIONS.index(st.session_state.selected_voice)
         )
         
         # Tone selection
         st.subheader("Tone Adaptation")
-        tone_options = ["Neutral", "Suspenseful", "Inspiring"]
         st.session_state.selected_tone = st.selectbox(
             "Select desired tone:",
-            tone_options,
-            index=tone_options.index(st.session_state.selected_tone)
+            TONE_OPTIONS,
+            index=TONE_OPTIONS.index(st.session_state.selected_tone)
         )
         
         # Tone descriptions
-        tone_descriptions = {
-            "Neutral": "📝 Clear, balanced, and objective narration",
-            "Suspenseful": "🎭 Dramatic tension and engaging mystery",
-            "Inspiring": "✨ Uplifting and motivational delivery"
-        }
-        st.info(tone_descriptions[st.session_state.selected_tone])
+        st.info(TONE_DESCRIPTIONS[st.session_state.selected_tone])
     
     # Main content area
     col1, col2 = st.columns([1, 1])
@@ -166,9 +642,8 @@ def main():
             )
             
             if text_input != st.session_state.original_text:
+                _reset_generated()
                 st.session_state.original_text = text_input
-                st.session_state.rewritten_text = ""
-                st.session_state.audio_data = None
                 
         else:
             uploaded_file = st.file_uploader(
@@ -180,9 +655,8 @@ def main():
             if uploaded_file is not None:
                 file_content = process_uploaded_file(uploaded_file)
                 if file_content and file_content != st.session_state.original_text:
+                    _reset_generated()
                     st.session_state.original_text = file_content
-                    st.session_state.rewritten_text = ""
-                    st.session_state.audio_data = None
                     
                     # Display uploaded content
                     st.text_area(
@@ -200,8 +674,7 @@ def main():
             if st.button("🔄 Generate Tone-Adapted Version", type="primary"):
                 with st.spinner(f"Rewriting text with {st.session_state.selected_tone} tone..."):
                     try:
-                        llm = MockWatsonxLLM()
-                        st.session_state.rewritten_text = llm.rewrite_text(
+                        st.session_state.rewritten_text = _adapt(
                             st.session_state.original_text,
                             st.session_state.selected_tone
                         )
@@ -222,91 +695,11 @@ def main():
     
     # Audio generation and playback section
     if st.session_state.rewritten_text:
-        st.markdown("---")
-        st.header("🎵 Audio Generation")
-        
-        col3, col4 = st.columns([1, 1])
-        
-        with col3:
-            if st.button("🎤 Generate Audio", type="primary"):
-                with st.spinner(f"Converting to speech with {st.session_state.selected_voice} voice..."):
-                    try:
-                        tts = MockWatsonTTS()
-                        audio_bytes = tts.synthesize(
-                            st.session_state.rewritten_text,
-                            st.session_state.selected_voice
-                        )
-                        st.session_state.audio_data = audio_bytes
-                        st.success("Audio generated successfully!")
-                    except Exception as e:
-                        st.error(f"Error generating audio: {str(e)}")
-        
-        with col4:
-            if st.session_state.audio_data:
-                st.subheader("🎧 Your Audiobook")
-                
-                # In a real implementation, you would use st.audio() with actual audio data
-                st.info("🎵 Audio preview would be available here")
-                st.caption(f"Voice: {st.session_state.selected_voice} | Tone: {st.session_state.selected_tone}")
-                
-                # Download link
-                filename = f"audiobook_{st.session_state.selected_tone.lower()}_{st.session_state.selected_voice.lower()}.mp3"
-                
-                # Mock download button (in real implementation, use actual audio data)
-                if st.download_button(
-                    label="📥 Download Audio File",
-                    data=base64.b64decode(st.session_state.audio_data),
-                    file_name=filename,
-                    mime="audio/mp3"
-                ):
-                    st.success("Download started!")
+        _audio_fragment()
     
     # Text comparison section
     if st.session_state.original_text and st.session_state.rewritten_text:
-        st.markdown("---")
-        st.header("📊 Side-by-Side Comparison")
-        
-        comparison_col1, comparison_col2 = st.columns([1, 1])
-        
-        with comparison_col1:
-            st.subheader("📄 Original Text")
-            st.text_area(
-                "Original:",
-                value=st.session_state.original_text,
-                height=200,
-                disabled=True,
-                key="original_comparison"
-            )
-            
-            # Text statistics
-            original_stats = {
-                "Words": len(st.session_state.original_text.split()),
-                "Characters": len(st.session_state.original_text),
-                "Estimated reading time": f"{len(st.session_state.original_text.split()) // 200 + 1} min"
-            }
-            
-            for stat, value in original_stats.items():
-                st.metric(stat, value)
-        
-        with comparison_col2:
-            st.subheader(f"🎨 {st.session_state.selected_tone} Version")
-            st.text_area(
-                f"{st.session_state.selected_tone} adaptation:",
-                value=st.session_state.rewritten_text,
-                height=200,
-                disabled=True,
-                key="rewritten_comparison"
-            )
-            
-            # Adapted text statistics
-            adapted_stats = {
-                "Words": len(st.session_state.rewritten_text.split()),
-                "Characters": len(st.session_state.rewritten_text),
-                "Estimated reading time": f"{len(st.session_state.rewritten_text.split()) // 200 + 1} min"
-            }
-            
-            for stat, value in adapted_stats.items():
-                st.metric(stat, value)
+        _comparison_fragment()
     
     # Footer
     st.markdown("---")